@@ -24,11 +24,17 @@ __author__ = "Michael Cohen <scudette@google.com>"
 
 """This plugin implements the config_updater initialization tool.
 """
+import binascii
+import multiprocessing
 import time
 import os
+import sys
+import tempfile
 import yaml
 
 from rekall import plugin
+from rekall_lib import crypto as lib_crypto
+from rekall_lib import utils
 from rekall_lib import yaml_utils
 from rekall_agent import crypto
 
@@ -39,6 +45,58 @@ from rekall_agent.policies import gcs
 from rekall_agent.servers import http_server
 
 
+def _read_all(path):
+    """Reads the entire file at path as bytes."""
+    with open(path, "rb") as fd:
+        return fd.read()
+
+
+# The private key implementations selectable with the key_type arg.
+PRIVATE_KEY_TYPES = dict(
+    rsa2048=crypto.RSAPrivateKey,
+    ecdsa_p256=lib_crypto.ECDSAPrivateKey,
+)
+
+
+def _generate_private_key_pem(key_type):
+    """Generates a new private key in a worker process.
+
+    The key is returned in PEM format because key objects are bound to the
+    session which can not be passed between processes.
+    """
+    return PRIVATE_KEY_TYPES[key_type]().generate_key().to_primitive()
+
+
+def _load_private_key(pem_string, session):
+    """Loads a private key of any of the supported key types."""
+    # ECDSAPrivateKey reports keys it can not load with CipherError, so try
+    # it first and fall back to RSA.
+    try:
+        return lib_crypto.ECDSAPrivateKey.from_primitive(
+            pem_string, session=session)
+    except lib_crypto.CipherError:
+        return crypto.RSAPrivateKey.from_primitive(pem_string, session=session)
+
+
+# Service account credential files keyed by (path, mtime, size). We only
+# cache the file data since the ServiceAccount object is mutable and holds a
+# session.
+SERVICE_ACCOUNT_CACHE = utils.FastStore(4, lock=True)
+
+
+def _load_service_account(path, session):
+    """Loads the service account credentials at path."""
+    st = os.stat(path)
+    cache_key = (os.path.abspath(path), st.st_mtime, st.st_size)
+    try:
+        data = SERVICE_ACCOUNT_CACHE.Get(cache_key)
+    except KeyError:
+        data = _read_all(path)
+        SERVICE_ACCOUNT_CACHE.Put(cache_key, data)
+
+    return cloud.ServiceAccount.from_json(data, session=session)
+
+
 class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
     """The base config initialization plugin.
 
@@ -60,6 +118,11 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
 
         dict(name="labels", type="Array", default=["All"],
              help="The list of labels."),
+
+        dict(name="key_type", type="Choices", default="rsa2048",
+             choices=sorted(PRIVATE_KEY_TYPES),
+             help="The type of newly generated CA and server keys. Existing "
+             "keys are reused regardless of their type."),
     ]
 
     table_header = [
@@ -72,28 +135,55 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
     server_certificate_filename = "server.certificate.pem"
     client_config_filename = "client.config.yaml"
     server_config_filename = "server.config.yaml"
-    secret = os.urandom(5).encode("hex")
+    secret = None
     client_config_warning = ("# Warning: Do not edit this file. "
                              "Edit the server config instead.\n")
 
     # We will generate or read these from existing config.
     ca_cert = server_cert = server_private_key = None
 
+    # Full paths to the files in config_dir, computed by collect().
+    _paths = None
+
+
+    def _generate_private_key(self):
+        """Generates a new private key of the selected key_type."""
+        return PRIVATE_KEY_TYPES[self.plugin_args.key_type](
+            session=self.session).generate_key()
+
+    def _generate_private_keys(self, count):
+        """Generates count new private keys in parallel."""
+        pool = multiprocessing.Pool(count)
+        try:
+            pem_keys = pool.map(_generate_private_key_pem,
+                                [self.plugin_args.key_type] * count)
+        finally:
+            pool.close()
+            pool.join()
+
+        return [_load_private_key(x, self.session) for x in pem_keys]
 
     def generate_keys(self):
         """Generates various keys if needed."""
-        ca_private_key_filename = os.path.join(
-            self.config_dir, self.ca_private_key_filename)
-
-        ca_cert_filename = os.path.join(
-            self.config_dir, self.ca_cert_filename)
+        ca_private_key_filename = self._paths["ca_private_key"]
+        ca_cert_filename = self._paths["ca_cert"]
+        server_private_key_filename = self._paths["server_private_key"]
+        server_certificate_filename = self._paths["server_certificate"]
+
+        # Key generation is slow, so when both the CA and server keys need to
+        # be created we generate them concurrently up front.
+        new_private_keys = []
+        if not (os.access(ca_private_key_filename, os.R_OK) or
+                os.access(server_private_key_filename, os.R_OK)):
+            yield dict(Message="Generating new CA and Server private keys.")
+            new_private_keys = self._generate_private_keys(2)
 
         try:
-            ca_private_key = crypto.RSAPrivateKey.from_primitive(open(
-                ca_private_key_filename).read(), session=self.session)
+            ca_private_key = _load_private_key(
+                _read_all(ca_private_key_filename), self.session)
 
-            self.ca_cert = crypto.X509Ceritifcate.from_primitive(open(
-                ca_cert_filename).read(), session=self.session)
+            self.ca_cert = crypto.X509Ceritifcate.from_primitive(
+                _read_all(ca_cert_filename), session=self.session)
 
             yield dict(Message="Reusing existing CA keys in %s" %
                        ca_cert_filename)
@@ -101,8 +191,10 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
             yield dict(
                 Message="Generating new CA private key into %s and %s" % (
                     ca_private_key_filename, ca_cert_filename))
-            ca_private_key = crypto.RSAPrivateKey(
-                session=self.session).generate_key()
+            if new_private_keys:
+                ca_private_key = new_private_keys.pop(0)
+            else:
+                ca_private_key = self._generate_private_key()
 
             with open(ca_private_key_filename, "wb") as fd:
                 fd.write(ca_private_key.to_primitive())
@@ -113,18 +205,12 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
                 fd.write(self.ca_cert.to_primitive())
 
         # Now same thing with the server keys.
-        server_private_key_filename = os.path.join(
-            self.config_dir, self.server_private_key_filename)
-
-        server_certificate_filename = os.path.join(
-            self.config_dir, self.server_certificate_filename)
-
         try:
-            self.server_private_key = crypto.RSAPrivateKey.from_primitive(open(
-                server_private_key_filename).read(), session=self.session)
+            self.server_private_key = _load_private_key(
+                _read_all(server_private_key_filename), self.session)
 
-            self.server_cert = crypto.X509Ceritifcate.from_primitive(open(
-                server_certificate_filename).read(), session=self.session)
+            self.server_cert = crypto.X509Ceritifcate.from_primitive(
+                _read_all(server_certificate_filename), session=self.session)
 
             yield dict(Message="Reusing existing server keys in %s" %
                        server_certificate_filename)
@@ -132,8 +218,10 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
             yield dict(
                 Message="Generating new Server private keys into %s and %s" % (
                     server_private_key_filename, server_certificate_filename))
-            self.server_private_key = crypto.RSAPrivateKey(
-                session=self.session).generate_key()
+            if new_private_keys:
+                self.server_private_key = new_private_keys.pop(0)
+            else:
+                self.server_private_key = self._generate_private_key()
 
             with open(server_private_key_filename, "wb") as fd:
                 fd.write(self.server_private_key.to_primitive())
@@ -163,6 +251,12 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
         config.server.private_key = self.server_private_key
 
         config.client.labels = labels
+
+        # Generated lazily so importing this module does not draw entropy.
+        if self.secret is None:
+            self.secret = utils.SmartUnicode(
+                binascii.hexlify(os.urandom(5)))
+
         config.client.secret = self.secret
         config.client.writeback_path = self.plugin_args.client_writeback_path
 
@@ -201,8 +295,7 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
                 config.signed_manifest.data))
 
     def write_config(self):
-        server_config_filename = os.path.join(
-            self.config_dir, self.server_config_filename)
+        server_config_filename = self._paths["server_config"]
 
         if os.access(server_config_filename, os.R_OK):
             yield dict(
@@ -210,9 +303,10 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
                     server_config_filename))
 
             # Load existing server config.
-            server_config_data = open(server_config_filename, "rb").read()
-            config = agent.Configuration.from_primitive(
-                yaml.safe_load(server_config_data), session=self.session)
+            with open(server_config_filename, "rb", 1 << 16) as fd:
+                config = agent.Configuration.from_primitive(
+                    yaml.load(fd, Loader=yaml_utils.FastSafeLoader),
+                    session=self.session)
 
         else:
             # Make a new configuration
@@ -224,24 +318,29 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
             yield dict(Message="Writing server config file %s" %
                        server_config_filename)
 
+            # Serialize the config fully before opening the file so it is
+            # written with a single write() call.
+            server_config_data = utils.SmartStr(
+                yaml_utils.fast_dump(config.to_primitive()))
             with open(server_config_filename, "wb") as fd:
-                fd.write(yaml_utils.safe_dump(config.to_primitive()))
+                fd.write(server_config_data)
 
         # The client gets just the client part of the configuration.
         client_config = agent.Configuration(session=self.session)
         client_config.client = config.client
         client_config.ca_certificate = config.ca_certificate
 
-        client_config_filename = os.path.join(
-            self.config_dir, self.client_config_filename)
+        client_config_filename = self._paths["client_config"]
 
         yield dict(
             Message="Writing client config file %s" % (
                 client_config_filename))
 
+        client_config_data = utils.SmartStr(
+            self.client_config_warning +
+            yaml_utils.fast_dump(client_config.to_primitive()))
         with open(client_config_filename, "wb") as fd:
-            fd.write(self.client_config_warning +
-                     yaml_utils.safe_dump(client_config.to_primitive()))
+            fd.write(client_config_data)
 
         # Now load the server config file to make sure it is validly written.
         self.session.SetParameter("agent_configuration", server_config_filename)
@@ -260,9 +359,15 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
         yield dict(Message="Writing manifest file to %s" % (
             upload_location.to_path()))
 
-        upload_location.write_file(self._config.signed_manifest.to_json())
+        # Serialize the signed manifest into a spool file which only hits
+        # the disk for very large manifests, and stream it to the location.
+        with tempfile.SpooledTemporaryFile(max_size=1 << 20) as fd:
+            self._config.signed_manifest.to_json_stream(fd)
+            fd.seek(0)
+            upload_location.upload_file_object(fd)
 
-        print yaml_utils.safe_dump(self._config.manifest.to_primitive())
+        sys.stdout.write(
+            yaml_utils.safe_dump(self._config.manifest.to_primitive()))
 
 
     def collect(self):
@@ -272,11 +377,27 @@ class AgentServerInitialize(plugin.TypedProfileCommand, plugin.Command):
             raise plugin.PluginError("Unable to write to config directory %s" %
                                      self.config_dir)
 
-        for method in [self.generate_keys,
-                       self.write_config,
-                       self.write_manifest]:
-            for x in method():
-                yield x
+        # Full paths to all the files we manage in the config directory.
+        self._paths = {
+            name: os.path.join(self.config_dir, filename)
+            for name, filename in [
+                ("ca_private_key", self.ca_private_key_filename),
+                ("ca_cert", self.ca_cert_filename),
+                ("server_private_key", self.server_private_key_filename),
+                ("server_certificate", self.server_certificate_filename),
+                ("server_config", self.server_config_filename),
+                ("client_config", self.client_config_filename),
+            ]
+        }
+
+        for x in self.generate_keys():
+            yield x
+
+        for x in self.write_config():
+            yield x
+
+        for x in self.write_manifest():
+            yield x
 
         yield dict(Message="Done!")
 
@@ -295,9 +416,8 @@ class AgentServerInitializeGCS(AgentServerInitialize):
     ]
 
     def _build_config(self, config):
-        service_account = cloud.ServiceAccount.from_json(
-            open(self.plugin_args.service_account_path, "rb").read(),
-            session=self.session)
+        service_account = _load_service_account(
+            self.plugin_args.service_account_path, self.session)
 
         config.server = gcs.GCSServerPolicy.from_keywords(
             session=self.session,
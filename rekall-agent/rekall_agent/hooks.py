@@ -21,12 +21,40 @@
 #
 
 __author__ = "Michael Cohen <scudette@google.com>"
+import copy
 import os
 import yaml
+
 from rekall import kb
 from rekall import obj
 
 from rekall_lib import serializer
+from rekall_lib import utils
+from rekall_lib import yaml_utils
+
+
+# YAML parsed agent configuration files keyed by (path, mtime, size). This
+# allows the agent_config_obj parameter to be invalidated without re-parsing
+# the configuration file if it did not change on disk. We only cache the
+# primitive data since the Configuration object is mutable and holds a session.
+CONFIG_CACHE = utils.FastStore(8, lock=True)
+
+# YAML parsed agent configurations given in the REKALL_AGENT_CONFIG
+# environment variable, keyed by the data.
+ENV_CONFIG_CACHE = utils.FastStore(2, lock=True)
+
+# The agent configuration environment variables, resolved once at import.
+_ENV_CONFIG = _ENV_CONFIG_FILE = None
+
+
+def _reload_env():
+    """Re-reads the agent configuration environment variables."""
+    global _ENV_CONFIG, _ENV_CONFIG_FILE
+    _ENV_CONFIG = os.environ.get("REKALL_AGENT_CONFIG")
+    _ENV_CONFIG_FILE = os.environ.get("REKALL_AGENT_CONFIG_FILE")
+
+
+_reload_env()
 
 
 class AgentMode(kb.ParameterHook):
@@ -53,35 +81,71 @@ class AgentControllerMode(kb.ParameterHook):
 class AgentConfigHook(kb.ParameterHook):
     name = "agent_config_obj"
 
-    def calculate(self):
-        config_data = self.session.GetParameter("agent_config_data")
-        if not config_data:
-            config_data = os.environ.get("REKALL_AGENT_CONFIG")
-
-        if not config_data:
-            # The configuration file can be given in the session, or specified
-            # on the command line. This is the path to the agent config file.
-            agent_config = self.session.GetParameter("agent_configuration")
-            if not agent_config:
-                agent_config = os.environ.get("REKALL_AGENT_CONFIG_FILE")
-
-            if agent_config:
-                # Set the search path to the location of the configuration
-                # file. This allows @file directives to access files relative to
-                # the main config file.
-                if self.session.GetParameter("config_search_path") == None:
-                    self.session.SetParameter(
-                        "config_search_path", [os.path.dirname(agent_config)])
-
-                with open(agent_config, "rb") as fd:
-                    config_data = fd.read()
-
-        if not config_data:
-            return obj.NoneObject("No valid configuration provided in session.")
+    def _parse_config(self, data):
+        """Builds a new Configuration from the YAML parsed data."""
+        # The data may be shared through the cache so never let the
+        # Configuration hold references into it.
+        data = copy.deepcopy(data)
 
         # We deliberately do not raise errors for unknown fields in
         # case the configuration was created in older agent version -
         # We just ignore unknown fields.
         return serializer.unserialize(
-            session=self.session, data=yaml.safe_load(config_data),
-            strict_parsing=False)
+            session=self.session, data=data, strict_parsing=False)
+
+    def calculate(self):
+        # A Configuration already set in the session (e.g. by
+        # agent_server_initialize) or cached from a previous run of this hook
+        # is returned by session.GetParameter() without calling us. We only
+        # get here when the parameter is unset or the caller passed
+        # cached=False, so returning the session's cached Configuration here
+        # would defeat the explicit request for a fresh value. Unchanged
+        # config files are instead served from CONFIG_CACHE.
+        config_data = self.session.GetParameter("agent_config_data")
+        if config_data:
+            return self._parse_config(
+                yaml.load(config_data, Loader=yaml_utils.FastSafeLoader))
+
+        config_data = _ENV_CONFIG
+        if config_data:
+            try:
+                data = ENV_CONFIG_CACHE.Get(config_data)
+            except KeyError:
+                data = yaml.load(config_data, Loader=yaml_utils.FastSafeLoader)
+                ENV_CONFIG_CACHE.Put(config_data, data)
+
+            return self._parse_config(data)
+
+        # The configuration file can be given in the session, or specified
+        # on the command line. This is the path to the agent config file.
+        agent_config = self.session.GetParameter("agent_configuration")
+        if not agent_config:
+            agent_config = _ENV_CONFIG_FILE
+
+        if not agent_config:
+            return obj.NoneObject("No valid configuration provided in session.")
+
+        # Set the search path to the location of the configuration
+        # file. This allows @file directives to access files relative to
+        # the main config file.
+        if self.session.GetParameter("config_search_path") == None:
+            self.session.SetParameter(
+                "config_search_path", [os.path.dirname(agent_config)])
+
+        # Only re-parse the file if it was modified since we last read it.
+        st = os.stat(agent_config)
+        if not st.st_size:
+            return obj.NoneObject("No valid configuration provided in session.")
+
+        cache_key = (os.path.abspath(agent_config), st.st_mtime, st.st_size)
+        try:
+            data = CONFIG_CACHE.Get(cache_key)
+        except KeyError:
+            # Let the parser consume the file directly instead of reading it
+            # into a separate buffer first.
+            with open(agent_config, "rb", 1 << 16) as fd:
+                data = yaml.load(fd, Loader=yaml_utils.FastSafeLoader)
+
+            CONFIG_CACHE.Put(cache_key, data)
+
+        return self._parse_config(data)
@@ -0,0 +1,87 @@
+import os
+
+import mock
+
+from rekall import testlib
+from rekall_agent import hooks
+from rekall_agent.policies import files as policy_files
+from rekall_lib import utils
+from rekall_lib import yaml_utils
+from rekall_lib.rekall_types import agent
+
+
+class TestAgentConfigHook(testlib.RekallBaseUnitTestCase):
+    """Test loading the agent configuration from a file."""
+
+    def setUp(self):
+        super(TestAgentConfigHook, self).setUp()
+        hooks.CONFIG_CACHE.Flush()
+
+        # Make sure the hook only sees the config file under test.
+        self.addCleanup(hooks._reload_env)
+        env_patcher = mock.patch.dict(os.environ)
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        os.environ.pop("REKALL_AGENT_CONFIG", None)
+        os.environ.pop("REKALL_AGENT_CONFIG_FILE", None)
+        hooks._reload_env()
+
+        self.config_path = os.path.join(self.temp_directory, "agent.yaml")
+        self._write_config(self.temp_directory)
+        self.session.SetParameter("agent_configuration", self.config_path)
+
+    def _write_config(self, root_path):
+        config = agent.Configuration.from_keywords(
+            session=self.session,
+            server=policy_files.FileBasedServerPolicy.from_keywords(
+                session=self.session,
+                root_path=root_path)
+        )
+
+        with open(self.config_path, "wb") as fd:
+            fd.write(utils.SmartStr(
+                yaml_utils.safe_dump(config.to_primitive())))
+
+    def _get_config(self):
+        return self.session.GetParameter("agent_config_obj", cached=False)
+
+    def testUnchangedFileIsNotReparsed(self):
+        with mock.patch.object(
+                hooks.yaml, "load", wraps=hooks.yaml.load) as load:
+            config1 = self._get_config()
+            config2 = self._get_config()
+
+        self.assertEqual(load.call_count, 1)
+
+        # Each run of the hook still produces a new Configuration.
+        self.assertIsNot(config1, config2)
+        self.assertEqual(config2.server.root_path, self.temp_directory)
+
+    def testChangedSizeIsReparsed(self):
+        self._get_config()
+
+        other_path = os.path.join(self.temp_directory, "other")
+        self._write_config(other_path)
+
+        with mock.patch.object(
+                hooks.yaml, "load", wraps=hooks.yaml.load) as load:
+            config = self._get_config()
+
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(config.server.root_path, other_path)
+
+    def testChangedMtimeIsReparsed(self):
+        self._get_config()
+
+        st = os.stat(self.config_path)
+        os.utime(self.config_path, (st.st_atime, st.st_mtime + 10))
+
+        with mock.patch.object(
+                hooks.yaml, "load", wraps=hooks.yaml.load) as load:
+            self._get_config()
+
+        self.assertEqual(load.call_count, 1)
+
+
+if __name__ == "__main__":
+    testlib.main()
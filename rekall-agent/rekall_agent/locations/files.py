@@ -119,7 +119,8 @@ class FileLocationImpl(location.FileLocation):
                                         local_filename)
                 os.unlink(local_filename)
 
-    def upload_file_object(self, infd, **kwargs):
+    def upload_file_object(self, infd, completion_routine=None, **kwargs):
+        _ = completion_routine
         path = self.to_path(**kwargs)
         self._ensure_dir_exists(path)
 
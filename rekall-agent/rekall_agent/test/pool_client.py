@@ -1,4 +1,6 @@
 import argparse
+import functools
+import json
 import logging
 import yaml
 
@@ -6,7 +8,12 @@ from rekall_agent import agent
 from rekall_agent import common
 from rekall import plugins
 from rekall import session
-from rekall import yaml_utils
+from rekall_lib import utils
+from rekall_lib import yaml_utils
+
+
+# Replaced by each client's writeback path in the config template.
+WRITEBACK_PATH_PLACEHOLDER = b"__WRITEBACK_PATH__"
 
 
 parser = argparse.ArgumentParser(description='Rekall Agent Pool Client')
@@ -22,16 +29,17 @@ parser.add_argument('--verbose', action="store_true",
                     help='Total number of clients to run.')
 
 
-def launch_client(_):
-    flags, client_number = _
-    config = yaml.safe_load(open(flags.config).read())
-    config["client"]["writeback_path"] = "%s/pool_writeback%s.yaml" % (
+def launch_client(flags, config_template, client_number):
+    writeback_path = "%s/pool_writeback%s.yaml" % (
         flags.state_dir, client_number)
     config_file_name = "%s/pool_config%s.yaml" % (
         flags.state_dir, client_number)
 
     with open(config_file_name, "wb") as fd:
-        fd.write(yaml_utils.safe_dump(config))
+        # A JSON string is also a valid double quoted YAML scalar.
+        fd.write(config_template.replace(
+            WRITEBACK_PATH_PLACEHOLDER,
+            utils.SmartStr(json.dumps(writeback_path))))
 
     rekall_session = session.Session(agent_configuration=config_file_name)
     agent_plugin = agent.RekallAgent(
@@ -47,7 +55,19 @@ if __name__ == '__main__':
     if args.verbose:
         logging.getLogger().setLevel(10)
 
+    # All clients share the same configuration except for the writeback
+    # path, so parse and serialize it only once.
+    with open(args.config, "rb", 1 << 16) as fd:
+        config = yaml.load(fd, Loader=yaml_utils.FastSafeLoader)
+
+    config["client"]["writeback_path"] = utils.SmartUnicode(
+        WRITEBACK_PATH_PLACEHOLDER)
+    config_template = utils.SmartStr(yaml_utils.safe_dump(config))
+
+    # Clients never return so each must be dispatched on its own (chunksize
+    # of 1), otherwise the remaining clients in a chunk would never start.
     workers = common.LoggingPool(args.number + 10)
-    workers.map(
-        launch_client,
-        [(args, i) for i in range(args.number)])
+    for _ in workers.imap_unordered(
+            functools.partial(launch_client, args, config_template),
+            range(args.number), chunksize=1):
+        pass
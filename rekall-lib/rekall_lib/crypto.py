@@ -9,7 +9,9 @@ from rekall_lib import serializer
 from rekall_lib import utils
 from Crypto import Random
 from Crypto.Hash import SHA256
+from Crypto.Signature import DSS
 from Crypto.Signature import PKCS1_v1_5
+from Crypto.PublicKey import ECC
 from Crypto.PublicKey import RSA
 
 # Needed to make PyInstaller include these modules.
@@ -104,6 +106,88 @@ class RSAPrivateKey(serializer.SerializedObject):
         return bool(self._value)
 
 
+class ECDSAPublicKey(serializer.SerializedObject):
+    """A type representing an ECDSA public key."""
+
+    _value = None
+
+    def to_primitive(self, with_type=True):
+        if not self._value:
+            raise RuntimeError("Key not initialized yet.")
+
+        return utils.SmartUnicode(self._value.export_key(format="PEM"))
+
+    @classmethod
+    def from_primitive(cls, pem_string, session=None):
+        result = cls(session)
+        try:
+            result._value = ECC.import_key(utils.SmartUnicode(pem_string))
+        except (TypeError, ValueError) as e:
+            raise CipherError("Public Key invalid: %s" % e)
+        return result
+
+    def from_raw_key(self, value):
+        self._value = value
+        return self
+
+    def verify(self, message, signature):
+        hash = SHA256.new(message)
+        verifier = DSS.new(self._value, "fips-186-3")
+        try:
+            verifier.verify(hash, signature)
+            return True
+        except ValueError:
+            return False
+
+    def __bool__(self):
+        return bool(self._value)
+
+
+class ECDSAPrivateKey(serializer.SerializedObject):
+    """A type representing an ECDSA (NIST P-256) private key.
+
+    Generating these is much faster than generating RSA keys.
+    """
+
+    _value = ""
+
+    def generate_key(self):
+        self._value = ECC.generate(curve="P-256")
+        self._signal_modified()
+        return self
+
+    def to_primitive(self, with_type=True):
+        if not self._value:
+            raise RuntimeError("Key not initialized yet.")
+
+        return utils.SmartUnicode(self._value.export_key(format="PEM"))
+
+    @classmethod
+    def from_primitive(cls, pem_string, session=None):
+        result = cls(session=session)
+        try:
+            result._value = ECC.import_key(utils.SmartUnicode(pem_string))
+        except (TypeError, ValueError) as e:
+            raise CipherError("Private Key invalid: %s" % e)
+
+        if not result._value.has_private():
+            raise CipherError("Private Key invalid: Not a private key.")
+
+        return result
+
+    def public_key(self):
+        return ECDSAPublicKey(session=self._session).from_raw_key(
+            self._value.public_key())
+
+    def sign(self, message):
+        hash = SHA256.new(message)
+        signer = DSS.new(self._value, "fips-186-3")
+        return signer.sign(hash)
+
+    def __bool__(self):
+        return bool(self._value)
+
+
 class HTTPAssertion(serializer.SerializedObject):
     """An assertion that will be signed with the HTTPSignature."""
     schema = [
@@ -0,0 +1,50 @@
+from Crypto.PublicKey import RSA
+
+from rekall import testlib
+from rekall_lib import crypto
+
+
+class TestECDSAKeys(testlib.RekallBaseUnitTestCase):
+    """Test the ECDSA key types."""
+
+    def setUp(self):
+        super(TestECDSAKeys, self).setUp()
+        self.private_key = crypto.ECDSAPrivateKey(
+            session=self.session).generate_key()
+
+    def testSignVerify(self):
+        signature = self.private_key.sign(b"hello world")
+        public_key = self.private_key.public_key()
+
+        self.assertTrue(public_key.verify(b"hello world", signature))
+        self.assertFalse(public_key.verify(b"goodbye world", signature))
+
+    def testSerialization(self):
+        private_key = crypto.ECDSAPrivateKey.from_primitive(
+            self.private_key.to_primitive(), session=self.session)
+
+        # A key loaded from PEM verifies signatures of the original key.
+        signature = self.private_key.sign(b"hello world")
+        self.assertTrue(
+            private_key.public_key().verify(b"hello world", signature))
+
+        public_key = crypto.ECDSAPublicKey.from_primitive(
+            self.private_key.public_key().to_primitive(),
+            session=self.session)
+        self.assertTrue(public_key.verify(b"hello world", signature))
+
+    def testRejectsPublicKey(self):
+        with self.assertRaises(crypto.CipherError):
+            crypto.ECDSAPrivateKey.from_primitive(
+                self.private_key.public_key().to_primitive(),
+                session=self.session)
+
+    def testRejectsRSAKey(self):
+        rsa_pem = RSA.generate(2048).exportKey("PEM")
+        with self.assertRaises(crypto.CipherError):
+            crypto.ECDSAPrivateKey.from_primitive(
+                rsa_pem, session=self.session)
+
+
+if __name__ == "__main__":
+    testlib.main()
@@ -30,6 +30,15 @@ class Location(serializer.SerializedObject):
         """Writes data to the location."""
         raise NotImplementedError()
 
+    def upload_file_object(self, fd, completion_routine=None, **kwargs):
+        """Writes the contents of the file like object fd to the location.
+
+        Implementations which are able to stream the upload should override
+        this.
+        """
+        _ = completion_routine
+        return self.write_file(fd.read(), **kwargs)
+
 
 class DevNull(Location):
     """Just swallow all data."""
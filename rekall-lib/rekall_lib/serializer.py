@@ -709,6 +709,12 @@ class SerializedObject(with_metaclass(SerializedObjectCompiler, object)):
     def to_json(self):
         return json.dumps(self.to_primitive(), sort_keys=True)
 
+    def to_json_stream(self, fd):
+        """Writes the same data as to_json() incrementally into fd."""
+        encoder = json.JSONEncoder(sort_keys=True)
+        for chunk in encoder.iterencode(self.to_primitive()):
+            fd.write(utils.SmartStr(chunk))
+
     @classmethod
     def from_json(cls, json_string, session=None, strict_parsing=False):
         data = json.loads(utils.SmartUnicode(json_string) or "{}")
@@ -1,6 +1,9 @@
 
+import io
+
 from rekall import testlib
 from rekall_lib import serializer
+from rekall_lib import utils
 
 
 class TestObject1(serializer.SerializedObject):
@@ -117,6 +120,16 @@ class TestSerializer(testlib.RekallBaseUnitTestCase):
 
         self.check_serialization(test_obj, {'C2': b'aGVsbG8='})
 
+    def testJSONStream(self):
+        """Streaming JSON serialization produces the same output as to_json."""
+        test_obj = TestObject1.from_keywords(
+            C1=5, R1=["hello", "world"], C2="hello", session=self.session)
+
+        fd = io.BytesIO()
+        test_obj.to_json_stream(fd)
+
+        self.assertEqual(fd.getvalue(), utils.SmartStr(test_obj.to_json()))
+
     def testInheritance(self):
         """We support a natural form of object inheritance.
 
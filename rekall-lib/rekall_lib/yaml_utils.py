@@ -111,12 +111,37 @@ PrettyPrinterDumper.add_representer(
     OrderedYamlDict, represent_orderedyamldict)
 
 
+# Use libyaml to parse and emit if PyYAML was built with it.
+if getattr(yaml, "__with_libyaml__", False):
+    FastSafeLoader = yaml.CSafeLoader
+
+    class FastPrettyPrinterDumper(yaml.CSafeDumper):
+        """A PrettyPrinterDumper which uses the libyaml emitter."""
+
+    FastPrettyPrinterDumper.add_representer(
+        str, unicode_representer)
+
+    FastPrettyPrinterDumper.add_representer(
+        OrderedYamlDict, represent_orderedyamldict)
+
+else:
+    FastSafeLoader = yaml.SafeLoader
+    FastPrettyPrinterDumper = PrettyPrinterDumper
+
+
 def safe_dump(data, **kwargs):
     kwargs["default_flow_style"] = False
     return yaml.dump_all(
         [data], None, Dumper=PrettyPrinterDumper, **kwargs)
 
 
+def fast_dump(data, **kwargs):
+    """Same as safe_dump() but uses libyaml to emit if it is available."""
+    kwargs["default_flow_style"] = False
+    return yaml.dump_all(
+        [data], None, Dumper=FastPrettyPrinterDumper, **kwargs)
+
+
 def ordered_load(stream, Loader=yaml.SafeLoader,
                  object_pairs_hook=collections.OrderedDict):
     """Load a yaml stream into OrderedDict.
@@ -0,0 +1,56 @@
+import mock
+import yaml
+
+from rekall import testlib
+from rekall_lib import yaml_utils
+
+
+PEM_STRING = """-----BEGIN PUBLIC KEY-----
+MFkwEwYHKoZIzj0CAQYIKoZIzj0DAQcDQgAE
+-----END PUBLIC KEY-----
+"""
+
+
+class TestYamlUtils(testlib.RekallBaseUnitTestCase):
+    """Test the YAML helpers."""
+
+    def setUp(self):
+        super(TestYamlUtils, self).setUp()
+        self.data = dict(
+            certificate=PEM_STRING,
+            long_string="x " * 100,
+            labels=["All", "Linux"],
+            number=5,
+            flag=True,
+            ordered=yaml_utils.OrderedYamlDict([("z", 1), ("a", 2)]),
+        )
+
+    def check_fast_dump(self):
+        fast_output = yaml_utils.fast_dump(self.data)
+
+        self.assertEqual(yaml.safe_load(fast_output),
+                         yaml.safe_load(yaml_utils.safe_dump(self.data)))
+
+        # Multi-line strings are still emitted as block literals.
+        self.assertIn("certificate: |\n", fast_output)
+
+        # Key order of ordered dicts is preserved.
+        self.assertLess(fast_output.index("z: 1"), fast_output.index("a: 2"))
+
+    def testFastDump(self):
+        self.check_fast_dump()
+
+    def testFastDumpWithoutLibYaml(self):
+        with mock.patch.object(yaml_utils, "FastPrettyPrinterDumper",
+                               yaml_utils.PrettyPrinterDumper):
+            self.check_fast_dump()
+
+    def testFastSafeLoader(self):
+        output = yaml_utils.safe_dump(self.data)
+        self.assertEqual(
+            yaml.load(output, Loader=yaml_utils.FastSafeLoader),
+            yaml.safe_load(output))
+
+
+if __name__ == "__main__":
+    testlib.main()